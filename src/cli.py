@@ -10,6 +10,13 @@ import yaml
 from datetime import datetime, timedelta
 from typing import Dict, Any
 
+# Shared HTTP session so scripted CLI loops reuse TCP connections
+# instead of paying a handshake per call
+SESSION = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
 
 @click.group()
 def cli():
@@ -40,7 +47,7 @@ def generate(description, hosts, inventory, run_time, safety_level, api_url, dry
     }
     
     try:
-        response = requests.post(f"{api_url}/generate-playbook/", json=request_data)
+        response = SESSION.post(f"{api_url}/generate-playbook/", json=request_data)
         response.raise_for_status()
         
         result = response.json()
@@ -82,7 +89,7 @@ def list_templates(api_url):
     """List available playbook templates"""
     
     try:
-        response = requests.get(f"{api_url}/templates/")
+        response = SESSION.get(f"{api_url}/templates/")
         response.raise_for_status()
         
         result = response.json()
@@ -117,7 +124,7 @@ def render_template(template_id, variables, api_url):
     try:
         vars_dict = json.loads(variables) if variables else {}
         
-        response = requests.post(f"{api_url}/templates/{template_id}/render", json=vars_dict)
+        response = SESSION.post(f"{api_url}/templates/{template_id}/render", json=vars_dict)
         response.raise_for_status()
         
         result = response.json()
@@ -146,7 +153,7 @@ def remove_task(task_id, api_url):
     """Remove a scheduled task"""
     
     try:
-        response = requests.delete(f"{api_url}/remove-task/{task_id}")
+        response = SESSION.delete(f"{api_url}/remove-task/{task_id}")
         response.raise_for_status()
         
         result = response.json()
@@ -163,11 +170,13 @@ def list_tasks(api_url, detailed):
     """List all scheduled tasks"""
     
     try:
-        response = requests.get(f"{api_url}/tasks/")
+        # One request returns the full detail payload when asked for
+        params = {"detailed": "true"} if detailed else None
+        response = SESSION.get(f"{api_url}/tasks/", params=params)
         response.raise_for_status()
-        
+
         result = response.json()
-        
+
         if result.get("success"):
             tasks = result["tasks"]
             if tasks:
@@ -206,7 +215,7 @@ def get_task(task_id, api_url):
     """Get detailed information about a specific task"""
     
     try:
-        response = requests.get(f"{api_url}/tasks/{task_id}")
+        response = SESSION.get(f"{api_url}/tasks/{task_id}")
         response.raise_for_status()
         
         result = response.json()
@@ -249,7 +258,7 @@ def status(api_url):
     """Check API status"""
     
     try:
-        response = requests.get(f"{api_url}/docs")
+        response = SESSION.get(f"{api_url}/docs")
         if response.status_code == 200:
             click.echo("✅ API is running")
         else:
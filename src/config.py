@@ -1,57 +1,78 @@
 import os
+from dataclasses import dataclass
+from functools import cached_property
 from typing import Optional
 
 
+@dataclass(frozen=True)
 class Config:
-    """Application configuration"""
-    
-    # LLM Configuration
-    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "openai")
-    OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
-    ANTHROPIC_API_KEY: Optional[str] = os.getenv("ANTHROPIC_API_KEY")
-    
-    # Database Configuration
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://user123:password@db:5432/tasksdb")
-    
-    # Redis Configuration
-    REDIS_URL: str = os.getenv("REDIS_URL", "redis://redis:6379/0")
-    
-    # Application Configuration
-    DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-    
-    # LLM Model Configuration
-    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
-    ANTHROPIC_MODEL: str = os.getenv("ANTHROPIC_MODEL", "claude-3-sonnet-20240229")
-    
-    # Safety Configuration
-    DEFAULT_SAFETY_LEVEL: str = os.getenv("DEFAULT_SAFETY_LEVEL", "medium")
-    MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "2000"))
-    TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.3"))
-    
-    @classmethod
-    def validate(cls) -> list:
-        """Validate configuration and return list of errors"""
+    """Application configuration, frozen once at process start"""
+
+    llm_provider: str
+    openai_api_key: Optional[str]
+    anthropic_api_key: Optional[str]
+    database_url: str
+    redis_url: str
+    debug: bool
+    log_level: str
+    openai_model: str
+    anthropic_model: str
+    default_safety_level: str
+    max_tokens: int
+    temperature: float
+
+    @cached_property
+    def validation_errors(self) -> tuple:
+        """Validation errors, computed once per process"""
         errors = []
-        
-        if cls.LLM_PROVIDER == "openai" and not cls.OPENAI_API_KEY:
+
+        if self.llm_provider == "openai" and not self.openai_api_key:
             errors.append("OPENAI_API_KEY is required when LLM_PROVIDER is 'openai'")
-        
-        if cls.LLM_PROVIDER == "anthropic" and not cls.ANTHROPIC_API_KEY:
+
+        if self.llm_provider == "anthropic" and not self.anthropic_api_key:
             errors.append("ANTHROPIC_API_KEY is required when LLM_PROVIDER is 'anthropic'")
-        
-        if cls.LLM_PROVIDER not in ["openai", "anthropic"]:
-            errors.append(f"Unsupported LLM_PROVIDER: {cls.LLM_PROVIDER}")
-        
-        return errors
-    
-    @classmethod
-    def get_llm_config(cls) -> dict:
-        """Get LLM-specific configuration"""
+
+        if self.llm_provider not in ["openai", "anthropic"]:
+            errors.append(f"Unsupported LLM_PROVIDER: {self.llm_provider}")
+
+        return tuple(errors)
+
+    def validate(self) -> tuple:
+        """Validate configuration and return a tuple of errors.
+
+        The fields are frozen at startup, so the result is memoized and
+        hot paths like /generate-playbook/ and /health pay nothing.
+        """
+        return self.validation_errors
+
+    @cached_property
+    def llm_config(self) -> dict:
+        """LLM-specific configuration, computed once per process"""
         return {
-            "provider": cls.LLM_PROVIDER,
-            "model": cls.OPENAI_MODEL if cls.LLM_PROVIDER == "openai" else cls.ANTHROPIC_MODEL,
-            "max_tokens": cls.MAX_TOKENS,
-            "temperature": cls.TEMPERATURE,
-            "api_key": cls.OPENAI_API_KEY if cls.LLM_PROVIDER == "openai" else cls.ANTHROPIC_API_KEY
-        } 
\ No newline at end of file
+            "provider": self.llm_provider,
+            "model": self.openai_model if self.llm_provider == "openai" else self.anthropic_model,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "api_key": self.openai_api_key if self.llm_provider == "openai" else self.anthropic_api_key
+        }
+
+
+def build_config() -> Config:
+    """Read the environment once and freeze it into a Config"""
+    return Config(
+        llm_provider=os.getenv("LLM_PROVIDER", "openai"),
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        anthropic_api_key=os.getenv("ANTHROPIC_API_KEY"),
+        database_url=os.getenv("DATABASE_URL", "postgresql://user123:password@db:5432/tasksdb"),
+        redis_url=os.getenv("REDIS_URL", "redis://redis:6379/0"),
+        debug=os.getenv("DEBUG", "True").lower() == "true",
+        log_level=os.getenv("LOG_LEVEL", "INFO"),
+        openai_model=os.getenv("OPENAI_MODEL", "gpt-4"),
+        anthropic_model=os.getenv("ANTHROPIC_MODEL", "claude-3-sonnet-20240229"),
+        default_safety_level=os.getenv("DEFAULT_SAFETY_LEVEL", "medium"),
+        max_tokens=int(os.getenv("MAX_TOKENS", "2000")),
+        temperature=float(os.getenv("TEMPERATURE", "0.3")),
+    )
+
+
+CONFIG = build_config()
@@ -1,51 +1,120 @@
-from fastapi import FastAPI, HTTPException, Depends
+import uvloop
+
+# Swap in the libuv event loop before the app is created
+uvloop.install()
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from celery.result import AsyncResult
+from celery import group
 from db.celery_app import (
+    run_playbook,
     schedule_task,
     app as celery_app,
     restore_tasks_from_db,
     save_task_to_db,
+    save_tasks_to_db,
 )
+from pydantic import TypeAdapter, ValidationError
 from tasks.task import Task, PlaybookGenerationRequest, PlaybookTemplateRequest, PlaybookValidationResult
-from models.models import SessionLocal, init_db
-from sqlalchemy.orm import Session
+from models.models import AsyncSessionLocal, TaskModel, async_engine, init_db
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from sqlalchemy.exc import SQLAlchemyError
-from llm.playbook_generator import PlaybookGenerator
+from llm.playbook_generator import get_generator
 from llm.template_manager import TemplateManager
-from config import Config
+from config import CONFIG
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime
+import orjson
+from typing import List, Optional
+import asyncio
+import json
+import logging
 import os
 
-app = FastAPI()
-init_db()
+logger = logging.getLogger(__name__)
 
 
-# Dependency for database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Arbitrary but fixed key identifying the startup-restore critical section
+_RESTORE_LOCK_KEY = 0x7461736B
 
 
-# Restore tasks from the database on startup
-@app.on_event("startup")
-async def startup_event():
-    db = next(get_db())
-    try:
-        restore_tasks_from_db(db)
-    finally:
-        db.close()
+async def _restore_tasks():
+    # Every uvicorn worker runs the lifespan, so without a gate each of
+    # the $(nproc) workers would republish every pending task. A
+    # session-level advisory lock elects one restorer; the losers skip.
+    async with async_engine.connect() as lock_conn:
+        acquired = (
+            await lock_conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"),
+                {"key": _RESTORE_LOCK_KEY},
+            )
+        ).scalar()
+        if not acquired:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await restore_tasks_from_db(db)
+        finally:
+            await lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"),
+                {"key": _RESTORE_LOCK_KEY},
+            )
+
+
+def _log_restore_failure(task):
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc:
+        logger.error(f"Task restore failed: {exc}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        await TemplateManager(db).initialize_default_templates()
+    # Restore in the background so startup doesn't block the first
+    # request. The reference lives on app.state so the task can't be
+    # garbage-collected mid-restore, and failures get logged instead of
+    # silently dropping the pending tasks.
+    restore_task = asyncio.create_task(_restore_tasks())
+    restore_task.add_done_callback(_log_restore_failure)
+    app.state.restore_task = restore_task
+    yield
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+
+# Parse request bodies straight from raw JSON in pydantic-core, skipping
+# the intermediate json.loads -> dict -> model hop
+_TASK_ADAPTER = TypeAdapter(Task)
+_GENERATION_ADAPTER = TypeAdapter(PlaybookGenerationRequest)
+
+
+# Dependency for async database session
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
 
 
 # Endpoint to add a task
 @app.post("/add-task/")
-async def add_task(task: Task, db: Session = Depends(get_db)):
+async def add_task(request: Request, db: AsyncSession = Depends(get_db)):
+    try:
+        task = _TASK_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
     try:
         # Save the task to the database
-        save_task_to_db(task, db)
+        db_task = await save_task_to_db(task, db)
         # Schedule the task using the saved task's ID
-        task_id = schedule_task(task, db)
+        task_id = schedule_task(db_task)
         return {"task_id": task_id, "message": "Task added " "to the queue"}
     except SQLAlchemyError as e:
         print(e)
@@ -54,12 +123,56 @@ async def add_task(task: Task, db: Session = Depends(get_db)):
         )
 
 
+# Endpoint to add many tasks in one request
+@app.post("/add-tasks/")
+async def add_tasks(tasks: List[Task], db: AsyncSession = Depends(get_db)):
+    try:
+        # One multi-row INSERT, then one batched publish for all tasks
+        task_ids = await save_tasks_to_db(tasks, db)
+        signatures = [
+            run_playbook.s(task_id).set(eta=task.run_time)
+            for task_id, task in zip(task_ids, tasks)
+        ]
+        group(signatures).apply_async()
+        return {
+            "task_ids": list(task_ids),
+            "message": f"{len(task_ids)} tasks added to the queue",
+        }
+    except SQLAlchemyError as e:
+        print(e)
+        raise HTTPException(
+            status_code=500, detail="Failed to save tasks " "to the database"
+        )
+
+
+def _task_states(task_ids):
+    """Fetch broker-side states for many tasks with a single Redis MGET."""
+    keys = [f"celery-task-meta-{task_id}" for task_id in task_ids]
+    metas = celery_app.backend.client.mget(keys)
+    # Tasks without a stored result are still pending
+    return [
+        json.loads(meta)["status"] if meta else "PENDING" for meta in metas
+    ]
+
+
+def _revoke_tasks(task_ids):
+    """Revoke all revocable tasks with one state lookup and one broadcast."""
+    states = _task_states(task_ids)
+    revocable = [
+        task_id
+        for task_id, state in zip(task_ids, states)
+        if state in ["PENDING", "RECEIVED"]
+    ]
+    if revocable:
+        celery_app.control.revoke(revocable, terminate=True)
+    return revocable
+
+
 # Endpoint to remove a task
 @app.delete("/remove-task/{task_id}")
 async def remove_task(task_id: str):
-    result = AsyncResult(task_id, app=celery_app)
-    if result.state in ["PENDING", "RECEIVED"]:
-        result.revoke(terminate=True)
+    revoked = _revoke_tasks([task_id])
+    if revoked:
         return {"message": f"Task {task_id} revoked"}
     # fmt: off
     raise HTTPException(status_code=404,
@@ -69,15 +182,65 @@ async def remove_task(task_id: str):
 # fmt: on
 
 
+# Endpoint to revoke many tasks in one broadcast
+@app.post("/revoke-tasks/")
+async def revoke_tasks(task_ids: List[str]):
+    revoked = _revoke_tasks(task_ids)
+    return {
+        "revoked": revoked,
+        "message": f"{len(revoked)} of {len(task_ids)} tasks revoked",
+    }
+
+
 # Endpoint to list all tasks
-@app.get("/tasks/")
-async def list_tasks(db: Session = Depends(get_db)):
-    """List all tasks in the database"""
+@app.get("/tasks/", response_class=ORJSONResponse, response_model=None)
+async def list_tasks(
+    detailed: bool = False,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """List tasks in keyset-paginated pages ordered by (run_time, id)"""
     try:
-        from db.celery_app import load_tasks_from_db
-        
-        tasks = load_tasks_from_db(db)
-        
+        # Load only the columns the list view renders; the large
+        # playbook_content TEXT stays on the server unless asked for
+        columns = [
+            TaskModel.id,
+            TaskModel.playbook_path,
+            TaskModel.inventory,
+            TaskModel.run_time,
+            TaskModel.is_generated,
+            TaskModel.safety_validated,
+            TaskModel.generation_metadata,
+            TaskModel.validation_errors,
+        ]
+        if detailed:
+            columns.append(TaskModel.playbook_content)
+        stmt = (
+            select(TaskModel)
+            .options(load_only(*columns))
+            .order_by(TaskModel.run_time, TaskModel.id)
+            .limit(limit)
+        )
+        if cursor:
+            # Cursor is the (run_time, id) key of the last row seen,
+            # encoded as "<iso run_time>|<id>"
+            try:
+                run_time_raw, _, cursor_id = cursor.partition("|")
+                cursor_key = (datetime.fromisoformat(run_time_raw), int(cursor_id))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            stmt = stmt.where(
+                tuple_(TaskModel.run_time, TaskModel.id) > cursor_key
+            )
+        result = await db.execute(stmt)
+        tasks = result.scalars().all()
+
+        next_cursor = None
+        if len(tasks) == limit:
+            last = tasks[-1]
+            next_cursor = f"{last.run_time.isoformat()}|{last.id}"
+
         task_list = []
         for task in tasks:
             # Get Celery task status if available
@@ -86,67 +249,88 @@ async def list_tasks(db: Session = Depends(get_db)):
                 task_status = celery_result.state
             except:
                 task_status = "UNKNOWN"
-            
+
             task_info = {
                 "id": task.id,
                 "playbook_path": task.playbook_path,
                 "inventory": task.inventory,
-                "run_time": task.run_time.isoformat() if task.run_time else None,
+                "run_time": task.run_time,
                 "is_generated": task.is_generated,
                 "safety_validated": task.safety_validated,
                 "status": task_status,
                 "generation_metadata": task.generation_metadata,
                 "validation_errors": task.validation_errors
             }
+            if detailed:
+                task_info["playbook_content"] = task.playbook_content
             task_list.append(task_info)
-        
+
         return {
             "success": True,
             "tasks": task_list,
             "total_count": len(task_list),
+            "next_cursor": next_cursor,
             "message": f"Found {len(task_list)} tasks"
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list tasks: {str(e)}")
 
 
+# Rendered /tasks/{id} payloads keyed by (id, run_time, status); a task
+# row is immutable for a given run_time, so repeated detail hits reuse
+# the serialized bytes instead of re-walking the envelope
+_TASK_RENDER_CACHE: OrderedDict = OrderedDict()
+_TASK_RENDER_CACHE_MAX = 1024
+
+
 # Endpoint to get a specific task
-@app.get("/tasks/{task_id}")
-async def get_task(task_id: int, db: Session = Depends(get_db)):
+@app.get("/tasks/{task_id}", response_class=ORJSONResponse, response_model=None)
+async def get_task(task_id: int, db: AsyncSession = Depends(get_db)):
     """Get details of a specific task"""
     try:
-        task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
-        
+        result = await db.execute(select(TaskModel).filter(TaskModel.id == task_id))
+        task = result.scalar_one_or_none()
+
         if not task:
             raise HTTPException(status_code=404, detail=f"Task {task_id} not found")
-        
+
         # Get Celery task status
         try:
             celery_result = AsyncResult(str(task.id), app=celery_app)
             task_status = celery_result.state
         except:
             task_status = "UNKNOWN"
-        
-        task_info = {
-            "id": task.id,
-            "playbook_path": task.playbook_path,
-            "inventory": task.inventory,
-            "run_time": task.run_time.isoformat() if task.run_time else None,
-            "playbook_content": task.playbook_content,
-            "is_generated": task.is_generated,
-            "safety_validated": task.safety_validated,
-            "status": task_status,
-            "generation_metadata": task.generation_metadata,
-            "validation_errors": task.validation_errors
-        }
-        
-        return {
-            "success": True,
-            "task": task_info,
-            "message": f"Task {task_id} details retrieved successfully"
-        }
-        
+
+        version = int(task.run_time.timestamp()) if task.run_time else 0
+        cache_key = (task_id, version, task_status)
+        body = _TASK_RENDER_CACHE.get(cache_key)
+        if body is None:
+            task_info = {
+                "id": task.id,
+                "playbook_path": task.playbook_path,
+                "inventory": task.inventory,
+                "run_time": task.run_time,
+                "playbook_content": task.playbook_content,
+                "is_generated": task.is_generated,
+                "safety_validated": task.safety_validated,
+                "status": task_status,
+                "generation_metadata": task.generation_metadata,
+                "validation_errors": task.validation_errors
+            }
+            body = orjson.dumps({
+                "success": True,
+                "task": task_info,
+                "message": f"Task {task_id} details retrieved successfully"
+            })
+            _TASK_RENDER_CACHE[cache_key] = body
+            if len(_TASK_RENDER_CACHE) > _TASK_RENDER_CACHE_MAX:
+                _TASK_RENDER_CACHE.popitem(last=False)
+
+        return Response(content=body, media_type="application/json")
+
     except HTTPException:
         raise
     except Exception as e:
@@ -161,20 +345,26 @@ async def clear_queue():
 
 # LLM-based playbook generation endpoint
 @app.post("/generate-playbook/")
-async def generate_playbook(request: PlaybookGenerationRequest, db: Session = Depends(get_db)):
+async def generate_playbook(request: Request, db: AsyncSession = Depends(get_db)):
+    try:
+        gen_request = _GENERATION_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
     try:
         # Validate configuration
-        config_errors = Config.validate()
+        config_errors = CONFIG.validate()
         if config_errors:
             raise HTTPException(status_code=500, detail=f"Configuration errors: {', '.join(config_errors)}")
-        
-        # Initialize LLM generator
-        llm_config = Config.get_llm_config()
-        generator = PlaybookGenerator(provider=llm_config["provider"], api_key=llm_config["api_key"])
-        
+
+        llm_config = CONFIG.llm_config
+        generator = get_generator(llm_config["provider"], api_key=llm_config["api_key"])
+
+        # Walk the model once and reuse the payload below
+        payload = gen_request.model_dump()
+
         # Generate playbook
-        generation_result = generator.generate_playbook(request.dict())
-        
+        generation_result = await generator.generate_playbook(payload)
+
         if not generation_result["is_valid"]:
             return {
                 "success": False,
@@ -182,21 +372,21 @@ async def generate_playbook(request: PlaybookGenerationRequest, db: Session = De
                 "warnings": generation_result["warnings"],
                 "safety_score": generation_result["safety_score"]
             }
-        
+
         # Create task with generated playbook
         task = Task(
-            playbook_path=f"/tmp/generated_playbook_{request.run_time.timestamp()}.yml",
-            inventory=request.inventory,
-            run_time=request.run_time,
+            playbook_path=f"/tmp/generated_playbook_{payload['run_time'].timestamp()}.yml",
+            inventory=payload["inventory"],
+            run_time=payload["run_time"],
             playbook_content=generation_result["playbook_content"],
             is_generated=True,
             generation_metadata=generation_result["generation_metadata"]
         )
-        
+
         # Save and schedule task
-        save_task_to_db(task, db)
-        task_id = schedule_task(task, db)
-        
+        db_task = await save_task_to_db(task, db)
+        task_id = schedule_task(db_task)
+
         return {
             "success": True,
             "task_id": task_id,
@@ -205,17 +395,56 @@ async def generate_playbook(request: PlaybookGenerationRequest, db: Session = De
             "warnings": generation_result["warnings"],
             "message": "Playbook generated and scheduled successfully"
         }
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Playbook generation failed: {str(e)}")
 
 
+async def _stream_playbook_events(generator, payload):
+    """Frame the raw LLM chunks as SSE events, then validate the whole.
+
+    Each chunk becomes one data event (multi-line chunks become
+    multiple data: lines of the same event, per the SSE grammar). Once
+    the stream ends, the accumulated content goes through the same
+    extraction and safety validation as the non-streaming endpoint and
+    the verdict is emitted as a final "validation" event, so streamed
+    playbooks never skip the dangerous-pattern check.
+    """
+    chunks = []
+    async for chunk in generator.stream_playbook(payload):
+        chunks.append(chunk)
+        data = "\n".join(f"data: {line}" for line in chunk.split("\n"))
+        yield f"{data}\n\n"
+
+    playbook_content = generator._extract_yaml_from_response("".join(chunks))
+    validation = generator._validate_playbook(
+        playbook_content, payload.get("safety_level", "medium")
+    )
+    yield f"event: validation\ndata: {orjson.dumps(validation).decode()}\n\n"
+
+
+# Streaming variant: the client sees tokens as the LLM produces them
+# instead of waiting for the whole completion
+@app.post("/generate-playbook/stream")
+async def generate_playbook_stream(request: PlaybookGenerationRequest):
+    config_errors = CONFIG.validate()
+    if config_errors:
+        raise HTTPException(status_code=500, detail=f"Configuration errors: {', '.join(config_errors)}")
+
+    llm_config = CONFIG.llm_config
+    generator = get_generator(llm_config["provider"], api_key=llm_config["api_key"])
+    return StreamingResponse(
+        _stream_playbook_events(generator, request.model_dump()),
+        media_type="text/event-stream",
+    )
+
+
 # Template management endpoints
 @app.post("/templates/")
-async def create_template(request: PlaybookTemplateRequest, db: Session = Depends(get_db)):
+async def create_template(request: PlaybookTemplateRequest, db: AsyncSession = Depends(get_db)):
     try:
         template_manager = TemplateManager(db)
-        template = template_manager.create_template(request.dict())
+        template = await template_manager.create_template(request.model_dump())
         return {
             "success": True,
             "template_id": template.id,
@@ -226,10 +455,10 @@ async def create_template(request: PlaybookTemplateRequest, db: Session = Depend
 
 
 @app.get("/templates/")
-async def list_templates(db: Session = Depends(get_db)):
+async def list_templates(db: AsyncSession = Depends(get_db)):
     try:
         template_manager = TemplateManager(db)
-        templates = template_manager.get_all_templates()
+        templates = await template_manager.get_all_templates_summary()
         return {
             "success": True,
             "templates": [
@@ -237,7 +466,7 @@ async def list_templates(db: Session = Depends(get_db)):
                     "id": t.id,
                     "name": t.name,
                     "description": t.description,
-                    "created_at": t.created_at.isoformat(),
+                    "created_at": t.created_at,
                     "variables_schema": t.variables_schema
                 }
                 for t in templates
@@ -248,13 +477,13 @@ async def list_templates(db: Session = Depends(get_db)):
 
 
 @app.get("/templates/{template_id}")
-async def get_template(template_id: int, db: Session = Depends(get_db)):
+async def get_template(template_id: int, db: AsyncSession = Depends(get_db)):
     try:
         template_manager = TemplateManager(db)
-        template = template_manager.get_template(template_id)
+        template = await template_manager.get_template(template_id)
         if not template:
             raise HTTPException(status_code=404, detail="Template not found")
-        
+
         return {
             "success": True,
             "template": {
@@ -263,7 +492,7 @@ async def get_template(template_id: int, db: Session = Depends(get_db)):
                 "description": template.description,
                 "template_content": template.template_content,
                 "variables_schema": template.variables_schema,
-                "created_at": template.created_at.isoformat()
+                "created_at": template.created_at
             }
         }
     except HTTPException:
@@ -273,22 +502,22 @@ async def get_template(template_id: int, db: Session = Depends(get_db)):
 
 
 @app.post("/templates/{template_id}/render")
-async def render_template(template_id: int, variables: dict, db: Session = Depends(get_db)):
+async def render_template(template_id: int, variables: dict, db: AsyncSession = Depends(get_db)):
     try:
         template_manager = TemplateManager(db)
-        
+
         # Validate variables
-        validation = template_manager.validate_variables(template_id, variables)
+        validation = await template_manager.validate_variables(template_id, variables)
         if not validation["valid"]:
             return {
                 "success": False,
                 "errors": validation["errors"],
                 "message": "Variable validation failed"
             }
-        
+
         # Render template
-        rendered_content = template_manager.render_template(template_id, variables)
-        
+        rendered_content = await template_manager.render_template(template_id, variables)
+
         return {
             "success": True,
             "rendered_content": rendered_content,
@@ -299,13 +528,13 @@ async def render_template(template_id: int, variables: dict, db: Session = Depen
 
 
 @app.delete("/templates/{template_id}")
-async def delete_template(template_id: int, db: Session = Depends(get_db)):
+async def delete_template(template_id: int, db: AsyncSession = Depends(get_db)):
     try:
         template_manager = TemplateManager(db)
-        success = template_manager.delete_template(template_id)
+        success = await template_manager.delete_template(template_id)
         if not success:
             raise HTTPException(status_code=404, detail="Template not found")
-        
+
         return {
             "success": True,
             "message": "Template deleted successfully"
@@ -320,21 +549,10 @@ async def delete_template(template_id: int, db: Session = Depends(get_db)):
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    config_errors = Config.validate()
+    config_errors = CONFIG.validate()
     return {
         "status": "healthy" if not config_errors else "unhealthy",
         "config_errors": config_errors,
-        "llm_provider": Config.LLM_PROVIDER,
-        "database_url": Config.DATABASE_URL.split("@")[1] if "@" in Config.DATABASE_URL else "configured"
+        "llm_provider": CONFIG.llm_provider,
+        "database_url": CONFIG.database_url.split("@")[1] if "@" in CONFIG.database_url else "configured"
     }
-
-
-# Initialize default templates on startup
-@app.on_event("startup")
-async def initialize_templates():
-    db = next(get_db())
-    try:
-        template_manager = TemplateManager(db)
-        template_manager.initialize_default_templates()
-    finally:
-        db.close()
@@ -1,8 +1,22 @@
-from celery import Celery
+import os
+
+# Must run before the SQLAlchemy engine is created so psycopg2 cooperates
+# with the eventlet worker pool (-P eventlet)
+if os.environ.get("CELERY_POOL") == "eventlet":
+    import eventlet
+
+    eventlet.monkey_patch()
+    from psycogreen.eventlet import patch_psycopg
+
+    patch_psycopg()
+
+from celery import Celery, group
+from celery.signals import worker_init, worker_process_init
 from datetime import datetime
-from models.models import TaskModel, SessionLocal
+from models.models import DATABASE_URL, TaskModel, SessionLocal, session_scope
 from tasks.task import Task
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 import ansible_runner
 
 # fmt: off
@@ -11,17 +25,90 @@ app = Celery("tasks",
              backend="redis://redis:6379/0")
 # fmt: on
 
-
-# Correct session management
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Keep a predictable number of cached broker connections for publishing
+app.conf.broker_pool_limit = 50
+
+# Keep broker sockets alive and health-checked so workers don't sit in
+# multi-second BRPOP reconnect loops before picking tasks up
+app.conf.update(
+    broker_transport_options={
+        "visibility_timeout": 3600,
+        "socket_timeout": 30,
+        "socket_connect_timeout": 10,
+        "socket_keepalive": True,
+        "health_check_interval": 10,
+    },
+    broker_connection_retry_on_startup=True,
+    redis_max_connections=100,
+    task_acks_late=False,
+    worker_prefetch_multiplier=4,
+)
+
+
+# Persistent runner dir so fact cache and ControlPersist sockets survive
+# between playbook runs on the same worker
+RUNNER_DATA_DIR = os.environ.get("RUNNER_DATA_DIR", "/var/lib/runner")
+
+# Skip the per-task module upload and SSH handshake where possible
+ANSIBLE_ENVVARS = {
+    "ANSIBLE_PIPELINING": "True",
+    "ANSIBLE_SSH_ARGS": "-o ControlMaster=auto -o ControlPersist=30m",
+    "ANSIBLE_CACHE_PLUGIN": "jsonfile",
+    "ANSIBLE_CACHE_PLUGIN_CONNECTION": os.path.join(RUNNER_DATA_DIR, "facts"),
+}
+
+
+def _run_ansible(playbook_path: str, inventory: str):
+    """Run a playbook streaming events instead of buffering them all.
+
+    The event handler only keeps summary counters, so memory per run stays
+    constant no matter how many events the playbook produces.
+    """
+    counters = {"events": 0, "failures": 0}
+
+    def _event_handler(event):
+        counters["events"] += 1
+        if event.get("event", "").endswith("_failed"):
+            counters["failures"] += 1
+        # Returning False discards the event instead of buffering it
+        return False
+
+    os.makedirs(RUNNER_DATA_DIR, exist_ok=True)
+    thread, runner = ansible_runner.run_async(
+        private_data_dir=RUNNER_DATA_DIR,
+        playbook=playbook_path,
+        inventory=inventory,
+        verbosity=5,
+        envvars=ANSIBLE_ENVVARS,
+        settings={"idle_timeout": 600},
+        event_handler=_event_handler,
+    )
+    thread.join()
+    return runner, counters
+
+
+@worker_init.connect
+@worker_process_init.connect
+def init_worker(**kwargs):
+    """Bind a fresh per-worker engine so pooled connections are never
+    shared across the fork and stay warm between task invocations.
+
+    Workers are separate processes, so each gets a small pool of its own
+    rather than sharing the API-sized one. worker_process_init only
+    fires for the prefork/solo pools; the eventlet pool runs in a
+    single process, so worker_init covers it (prefork children simply
+    rebind again after the fork)."""
+    pool_size = int(os.environ.get("WORKER_DB_POOL_SIZE", "5"))
+    worker_engine = create_engine(
+        DATABASE_URL,
+        pool_size=pool_size,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+    )
+    SessionLocal.configure(bind=worker_engine)
 
 
-def save_task_to_db(task: Task, db: Session):
+async def save_task_to_db(task: Task, db: AsyncSession):
     db_task = TaskModel(
         playbook_path=task.playbook_path,
         inventory=task.inventory,
@@ -31,95 +118,134 @@ def save_task_to_db(task: Task, db: Session):
         generation_metadata=task.generation_metadata,
     )
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    await db.commit()
+    # No refresh: the id comes back from INSERT..RETURNING during flush
+    # and expire_on_commit=False keeps the loaded attributes usable
     return db_task
 
 
-def load_tasks_from_db(db: Session):
-    return db.query(TaskModel).all()
+async def save_tasks_to_db(tasks, db: AsyncSession):
+    """Insert many tasks in one statement and return their ids.
 
+    The ids come back in parameter order so callers can zip them with
+    the input tasks; without sort_by_parameter_order the paged
+    RETURNING makes no ordering guarantee.
+    """
+    if not tasks:
+        return []
+    stmt = insert(TaskModel).returning(
+        TaskModel.id, sort_by_parameter_order=True
+    )
+    result = await db.execute(
+        stmt,
+        [
+            {
+                "playbook_path": task.playbook_path,
+                "inventory": task.inventory,
+                "run_time": task.run_time,
+                "playbook_content": task.playbook_content,
+                "is_generated": task.is_generated,
+                "generation_metadata": task.generation_metadata,
+            }
+            for task in tasks
+        ],
+    )
+    await db.commit()
+    return result.scalars().all()
 
-def restore_tasks_from_db(db: Session):
-    tasks = load_tasks_from_db(db)
-    for task in tasks:
-        schedule_task(task, db)
 
+async def load_tasks_from_db(db: AsyncSession):
+    result = await db.execute(select(TaskModel))
+    return result.scalars().all()
 
-@app.task
-def run_playbook(task_id: int):
-    db = next(get_db())
-    try:
-        task = db.query(TaskModel).filter(TaskModel.id == task_id).first()
-        if not task:
-            return f"Task {task_id} not found in database"
-
-        playbook_path = task.playbook_path
-        inventory = task.inventory
-        
-        # Handle generated playbooks
-        if task.is_generated and task.playbook_content:
-            import tempfile
-            import os
-            
-            # Create temporary playbook file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.yml', delete=False) as f:
-                f.write(task.playbook_content)
-                temp_playbook_path = f.name
-            
-            print(
-                f"Generated playbook started: {temp_playbook_path} "
-                f"with inventory: {inventory} at {datetime.now()}"
-            )
-            
-            try:
-                response = ansible_runner.run(
-                    private_data_dir="../..",
-                    playbook=temp_playbook_path,
-                    inventory=inventory,
-                    verbosity=5,
-                )
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_playbook_path)
-        else:
-            print(
-                f"Playbook started: {playbook_path} "
-                f"with inventory: {inventory} at {datetime.now()}"
-            )
-            
-            response = ansible_runner.run(
-                private_data_dir="../..",
-                playbook=playbook_path,
-                inventory=inventory,
-                verbosity=5,
-            )
 
-        if response.rc == 0:
-            result_message = f"Executed playbook successfully"
+async def restore_tasks_from_db(db: AsyncSession):
+    # Stream id/run_time pairs in index order instead of materialising
+    # every row; past-due tasks are published without an eta so they run
+    # immediately.
+    now = datetime.now()
+    stmt = (
+        select(TaskModel.id, TaskModel.run_time)
+        .order_by(TaskModel.run_time)
+        .execution_options(yield_per=500)
+    )
+    signatures = []
+    result = await db.stream(stmt)
+    async for task_id, run_time in result:
+        if run_time <= now:
+            signatures.append(run_playbook.s(task_id))
         else:
-            result_message = f"Failed to execute playbook"
+            signatures.append(run_playbook.s(task_id).set(eta=run_time))
+    if signatures:
+        # Publish all restored tasks over a single pooled broker
+        # connection instead of one connection round-trip per task; the
+        # rows are already persisted.
+        with app.producer_pool.acquire(block=True) as producer:
+            group(signatures).apply_async(producer=producer)
 
-        db.delete(task)
-        db.commit()
 
-        return result_message
-    finally:
-        db.close()
-
-
-def schedule_task(task: Task, db: Session):
-    db_task = TaskModel(
-        playbook_path=task.playbook_path,
-        inventory=task.inventory,
-        run_time=task.run_time,
-        playbook_content=task.playbook_content,
-        is_generated=task.is_generated,
-        generation_metadata=task.generation_metadata,
-    )
-    db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
-
-    result = run_playbook.apply_async(args=[db_task.id], eta=task.run_time)
+@app.task
+def run_playbook(task_id: int):
+    # Fetch and delete the row in one round-trip; the session is only
+    # held around the query, not the playbook run
+    with session_scope() as db:
+        task = db.execute(
+            delete(TaskModel)
+            .where(TaskModel.id == task_id)
+            .returning(
+                TaskModel.playbook_path,
+                TaskModel.inventory,
+                TaskModel.is_generated,
+                TaskModel.playbook_content,
+            )
+        ).first()
+    if not task:
+        return f"Task {task_id} not found in database"
+
+    playbook_path = task.playbook_path
+    inventory = task.inventory
+
+    # Handle generated playbooks
+    if task.is_generated and task.playbook_content:
+        import tempfile
+
+        # Create temporary playbook file
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.yml', delete=False) as f:
+            f.write(task.playbook_content)
+            temp_playbook_path = f.name
+
+        print(
+            f"Generated playbook started: {temp_playbook_path} "
+            f"with inventory: {inventory} at {datetime.now()}"
+        )
+
+        try:
+            runner, counters = _run_ansible(temp_playbook_path, inventory)
+        finally:
+            # Clean up temporary file
+            os.unlink(temp_playbook_path)
+    else:
+        print(
+            f"Playbook started: {playbook_path} "
+            f"with inventory: {inventory} at {datetime.now()}"
+        )
+
+        runner, counters = _run_ansible(playbook_path, inventory)
+
+    if runner.rc == 0:
+        result_message = f"Executed playbook successfully"
+    else:
+        result_message = f"Failed to execute playbook"
+
+    return result_message
+
+
+def schedule_task(db_task: TaskModel) -> str:
+    """Publish the already-persisted task to the worker queue."""
+    # Publish through the shared producer pool so the broker connection
+    # is reused across requests instead of set up per publish.
+    with app.producer_pool.acquire(block=True) as producer:
+        result = run_playbook.apply_async(
+            args=[db_task.id], eta=db_task.run_time, producer=producer
+        )
     return result.id
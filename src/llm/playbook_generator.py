@@ -1,15 +1,53 @@
 import os
+import re
+import hashlib
 import yaml
 import json
+
+try:
+    # C-backed loader when libyaml is available; ~10x faster parses
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+import httpx
 import openai
 import anthropic
-from jinja2 import Template
+from llm.template_manager import compile_template
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Safety patterns to avoid dangerous operations, compiled once at import
+# into a single case-insensitive alternation
+DANGEROUS_PATTERNS = [
+    "rm -rf",
+    "dd if=",
+    "mkfs",
+    "fdisk",
+    "parted",
+    "shutdown",
+    "reboot",
+    "halt",
+    "poweroff",
+    "init 0",
+    "init 6"
+]
+_DANGEROUS_RE = re.compile(
+    "|".join(re.escape(p) for p in DANGEROUS_PATTERNS), re.IGNORECASE
+)
+
+# Risky-module groups for high safety level; one scan of the lowered
+# text yields the hit set and the penalty falls out as arithmetic
+_RISKY_RE = re.compile(r"(?P<become>become)|(?P<shell_command>shell|command)")
+_RISKY_PENALTIES = {"become": 30.0, "shell_command": 10.0}
+
+# Code-fence extraction patterns, compiled once at import; an explicit
+# ```yaml fence wins over a generic one
+_YAML_FENCE_RE = re.compile(r"```yaml(.*?)```", re.DOTALL)
+_FENCE_RE = re.compile(r"```(.*?)```", re.DOTALL)
+
 
 class PlaybookGenerator:
     """LLM-powered Ansible playbook generator"""
@@ -18,25 +56,31 @@ class PlaybookGenerator:
         self.provider = provider
         self.api_key = api_key or os.getenv(f"{provider.upper()}_API_KEY")
         
-        if provider == "openai":
-            openai.api_key = self.api_key
-        elif provider == "anthropic":
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+        # Clients refuse to construct without credentials, so only build
+        # one when a key is actually available. Passing an explicit
+        # http_client pins one keep-alive pool per provider for the
+        # lifetime of the get_generator singletons; each SDK insists on
+        # its own client class, hence DefaultAsyncHttpxClient.
+        self.client = None
+        self._http = None
+        if provider == "openai" and self.api_key:
+            self._http = openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_keepalive_connections=20)
+            )
+            self.client = openai.AsyncOpenAI(
+                api_key=self.api_key, http_client=self._http
+            )
+        elif provider == "anthropic" and self.api_key:
+            self._http = anthropic.DefaultAsyncHttpxClient()
+            self.client = anthropic.AsyncAnthropic(
+                api_key=self.api_key, http_client=self._http
+            )
+
+        # Completed generations keyed by prompt hash, so identical
+        # requests skip the network entirely
+        self._response_cache: Dict[str, str] = {}
         
-        # Safety patterns to avoid dangerous operations
-        self.dangerous_patterns = [
-            "rm -rf",
-            "dd if=",
-            "mkfs",
-            "fdisk",
-            "parted",
-            "shutdown",
-            "reboot",
-            "halt",
-            "poweroff",
-            "init 0",
-            "init 6"
-        ]
+        self.dangerous_patterns = DANGEROUS_PATTERNS
         
         # Base prompt template for playbook generation
         self.base_prompt = """
@@ -59,7 +103,7 @@ Requirements:
 Generate a complete, valid YAML playbook that can be executed immediately.
 """
 
-    def generate_playbook(self, request: Dict[str, Any]) -> Dict[str, Any]:
+    async def generate_playbook(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """Generate an Ansible playbook using LLM"""
         try:
             # Prepare the prompt
@@ -70,12 +114,7 @@ Generate a complete, valid YAML playbook that can be executed immediately.
             )
             
             # Generate playbook content using LLM
-            if self.provider == "openai":
-                playbook_content = self._generate_with_openai(prompt)
-            elif self.provider == "anthropic":
-                playbook_content = self._generate_with_anthropic(prompt)
-            else:
-                raise ValueError(f"Unsupported provider: {self.provider}")
+            playbook_content = await self._generate(prompt)
             
             # Validate and clean the generated content
             playbook_content = self._extract_yaml_from_response(playbook_content)
@@ -114,10 +153,70 @@ Generate a complete, valid YAML playbook that can be executed immediately.
                 }
             }
 
-    def _generate_with_openai(self, prompt: str) -> str:
+    async def _generate(self, prompt: str) -> str:
+        """Dispatch to the configured provider, caching by prompt hash"""
+        prompt_hash = hashlib.sha1(prompt.encode()).hexdigest()
+        cached = self._response_cache.get(prompt_hash)
+        if cached is not None:
+            return cached
+
+        if self.provider == "openai":
+            content = await self._generate_with_openai(prompt)
+        elif self.provider == "anthropic":
+            content = await self._generate_with_anthropic(prompt)
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+        self._response_cache[prompt_hash] = content
+        return content
+
+    async def stream_playbook(self, request: Dict[str, Any]):
+        """Stream the raw LLM response chunk by chunk.
+
+        Yields plain text as the provider produces it, so callers see
+        first-token latency instead of waiting for the full completion.
+        Validation only makes sense on the whole document, so callers
+        should accumulate the chunks and validate at the end.
+        """
+        prompt = self.base_prompt.format(
+            description=request.get("description", ""),
+            hosts=request.get("hosts", "all"),
+            additional_context=request.get("additional_context", "")
+        )
+
+        if self.provider == "openai":
+            stream = await self.client.chat.completions.create(
+                model="gpt-4",
+                messages=[
+                    {"role": "system", "content": "You are an expert Ansible playbook developer. Generate only valid YAML playbooks."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=2000,
+                temperature=0.3,
+                stream=True
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        elif self.provider == "anthropic":
+            async with self.client.messages.stream(
+                model="claude-3-sonnet-20240229",
+                max_tokens=2000,
+                temperature=0.3,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+    async def _generate_with_openai(self, prompt: str) -> str:
         """Generate playbook using OpenAI API"""
         try:
-            response = openai.ChatCompletion.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "You are an expert Ansible playbook developer. Generate only valid YAML playbooks."},
@@ -131,10 +230,10 @@ Generate a complete, valid YAML playbook that can be executed immediately.
             logger.error(f"OpenAI API error: {str(e)}")
             raise
 
-    def _generate_with_anthropic(self, prompt: str) -> str:
+    async def _generate_with_anthropic(self, prompt: str) -> str:
         """Generate playbook using Anthropic API"""
         try:
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model="claude-3-sonnet-20240229",
                 max_tokens=2000,
                 temperature=0.3,
@@ -149,20 +248,13 @@ Generate a complete, valid YAML playbook that can be executed immediately.
 
     def _extract_yaml_from_response(self, response: str) -> str:
         """Extract YAML content from LLM response"""
-        # Try to find YAML content between ```yaml and ``` markers
-        if "```yaml" in response:
-            start = response.find("```yaml") + 7
-            end = response.find("```", start)
-            if end != -1:
-                return response[start:end].strip()
-        
-        # Try to find YAML content between ``` and ``` markers
-        if "```" in response:
-            start = response.find("```") + 3
-            end = response.find("```", start)
-            if end != -1:
-                return response[start:end].strip()
-        
+        match = (
+            _YAML_FENCE_RE.search(response)
+            or _FENCE_RE.search(response)
+        )
+        if match:
+            return match.group(1).strip()
+
         # If no markers found, return the whole response
         return response.strip()
 
@@ -171,22 +263,30 @@ Generate a complete, valid YAML playbook that can be executed immediately.
         errors = []
         warnings = []
         safety_score = 100.0
-        
+
+        # Cheap single-pass scan before parsing: content with dangerous
+        # patterns is rejected regardless, so don't pay for the YAML
+        # parse first. One lowercase pass serves every check below.
+        playbook_str = playbook_content.lower()
+        for pattern in dict.fromkeys(_DANGEROUS_RE.findall(playbook_str)):
+            errors.append(f"Dangerous pattern detected: {pattern}")
+            safety_score -= 20.0
+        if errors:
+            return {
+                "is_valid": False,
+                "errors": errors,
+                "warnings": warnings,
+                "safety_score": max(0.0, safety_score)
+            }
+
         try:
             # Parse YAML
-            playbook_data = yaml.safe_load(playbook_content)
-            
+            playbook_data = yaml.load(playbook_content, Loader=_SafeLoader)
+
             if not playbook_data:
                 errors.append("Empty or invalid YAML content")
                 return {"is_valid": False, "errors": errors, "warnings": warnings, "safety_score": 0.0}
-            
-            # Check for dangerous patterns
-            playbook_str = str(playbook_data).lower()
-            for pattern in self.dangerous_patterns:
-                if pattern in playbook_str:
-                    errors.append(f"Dangerous pattern detected: {pattern}")
-                    safety_score -= 20.0
-            
+
             # Check for required fields
             if not isinstance(playbook_data, list):
                 errors.append("Playbook must be a list of plays")
@@ -207,15 +307,15 @@ Generate a complete, valid YAML playbook that can be executed immediately.
                         warnings.append(f"Play {i} uses become - ensure this is necessary")
                         safety_score -= 5.0
             
-            # Safety level specific checks
+            # Safety level specific checks: one pass over the text,
+            # penalties summed from the named-group hit set
             if safety_level == "high":
-                if "become" in playbook_str:
+                hits = {m.lastgroup for m in _RISKY_RE.finditer(playbook_str)}
+                safety_score -= sum(_RISKY_PENALTIES[g] for g in hits)
+                if "become" in hits:
                     errors.append("High safety level: become operations not allowed")
-                    safety_score -= 30.0
-                
-                if "shell" in playbook_str or "command" in playbook_str:
+                if "shell_command" in hits:
                     warnings.append("High safety level: shell/command modules detected")
-                    safety_score -= 10.0
             
         except yaml.YAMLError as e:
             errors.append(f"YAML parsing error: {str(e)}")
@@ -233,8 +333,20 @@ Generate a complete, valid YAML playbook that can be executed immediately.
     def generate_from_template(self, template_content: str, variables: Dict[str, Any]) -> str:
         """Generate playbook from Jinja2 template"""
         try:
-            template = Template(template_content)
+            template = compile_template(template_content)
             return template.render(**variables)
         except Exception as e:
             logger.error(f"Template rendering error: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+
+# One generator per provider for the whole process, so the underlying
+# HTTP client keeps its connection pool across requests
+_SINGLETONS: Dict[str, "PlaybookGenerator"] = {}
+
+
+def get_generator(provider: str, api_key: Optional[str] = None) -> "PlaybookGenerator":
+    """Return the shared generator for a provider, creating it on first use"""
+    if provider not in _SINGLETONS:
+        _SINGLETONS[provider] = PlaybookGenerator(provider=provider, api_key=api_key)
+    return _SINGLETONS[provider]
@@ -1,23 +1,55 @@
 import os
+import hashlib
 import yaml
 import json
+import fastjsonschema
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from jinja2 import Template, Environment, FileSystemLoader
-from sqlalchemy.orm import Session
+from jinja2 import Template, Environment, FileSystemLoader, FileSystemBytecodeCache
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.models import PlaybookTemplate
 import logging
 
 logger = logging.getLogger(__name__)
 
+# One Environment for the whole process so compiled templates survive
+# across requests, with a bytecode cache that survives restarts
+_BYTECODE_CACHE_DIR = os.environ.get("JINJA_CACHE_DIR", "/tmp/jinja_cache")
+os.makedirs(_BYTECODE_CACHE_DIR, exist_ok=True)
+JINJA_ENV = Environment(
+    loader=FileSystemLoader('.'),
+    bytecode_cache=FileSystemBytecodeCache(_BYTECODE_CACHE_DIR),
+    auto_reload=False,
+    cache_size=1000,
+)
+
+# Compiled schema validators shared process-wide. Keyed by canonical
+# schema hash: TemplateManager instances are per-request, so an
+# instance-level cache would never see a second hit, and content
+# addressing makes explicit invalidation unnecessary.
+_VALIDATOR_CACHE: Dict[str, Any] = {}
+
+
+@lru_cache(maxsize=256)
+def compile_template(template_content: str) -> Template:
+    """Compile a Jinja2 template once per distinct content.
+
+    Module-level for the same reason as the validator cache: managers
+    are per-request, and keying by content means stale entries simply
+    stop being asked for when a template is edited."""
+    return JINJA_ENV.from_string(template_content)
+
 
 class TemplateManager:
     """Manage Jinja2 templates for Ansible playbook generation"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
-        self.env = Environment(loader=FileSystemLoader('.'))
-        
+        self.env = JINJA_ENV
+
         # Default templates
         self.default_templates = {
             "web_server": {
@@ -116,28 +148,43 @@ class TemplateManager:
             }
         }
     
-    def initialize_default_templates(self):
+    async def initialize_default_templates(self):
         """Initialize default templates in the database"""
-        for template_key, template_data in self.default_templates.items():
-            existing = self.db.query(PlaybookTemplate).filter(
-                PlaybookTemplate.name == template_data["name"]
-            ).first()
-            
-            if not existing:
-                template = PlaybookTemplate(
-                    name=template_data["name"],
-                    description=template_data["description"],
-                    template_content=template_data["template_content"],
-                    variables_schema=template_data["variables_schema"],
-                    created_at=datetime.now(),
-                    is_active=True
-                )
-                self.db.add(template)
-        
-        self.db.commit()
+        # One IN query for the existing names instead of a round-trip
+        # per default template on every startup
+        names = [t["name"] for t in self.default_templates.values()]
+        result = await self.db.execute(
+            select(PlaybookTemplate.name).filter(PlaybookTemplate.name.in_(names))
+        )
+        existing = set(result.scalars().all())
+
+        now = datetime.now()
+        missing = [
+            {
+                "name": template_data["name"],
+                "description": template_data["description"],
+                "template_content": template_data["template_content"],
+                "variables_schema": template_data["variables_schema"],
+                "created_at": now,
+                "is_active": True,
+            }
+            for template_data in self.default_templates.values()
+            if template_data["name"] not in existing
+        ]
+        if missing:
+            # insertmanyvalues pages these into multi-row VALUES clauses,
+            # so seeding stays one statement however many defaults exist
+            await self.db.execute(insert(PlaybookTemplate), missing)
+
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # Another worker seeded the same templates concurrently;
+            # their copy wins
+            await self.db.rollback()
         logger.info("Default templates initialized")
     
-    def create_template(self, template_data: Dict[str, Any]) -> PlaybookTemplate:
+    async def create_template(self, template_data: Dict[str, Any]) -> PlaybookTemplate:
         """Create a new template"""
         template = PlaybookTemplate(
             name=template_data["name"],
@@ -147,71 +194,107 @@ class TemplateManager:
             created_at=datetime.now(),
             is_active=True
         )
-        
+
         self.db.add(template)
-        self.db.commit()
-        self.db.refresh(template)
-        
+        await self.db.commit()
+        await self.db.refresh(template)
+
         logger.info(f"Created template: {template.name}")
         return template
     
-    def get_template(self, template_id: int) -> Optional[PlaybookTemplate]:
+    async def get_template(self, template_id: int) -> Optional[PlaybookTemplate]:
         """Get template by ID"""
-        return self.db.query(PlaybookTemplate).filter(
-            PlaybookTemplate.id == template_id,
-            PlaybookTemplate.is_active == True
-        ).first()
+        result = await self.db.execute(
+            select(PlaybookTemplate).filter(
+                PlaybookTemplate.id == template_id,
+                PlaybookTemplate.is_active == True
+            )
+        )
+        return result.scalar_one_or_none()
     
-    def get_all_templates(self) -> List[PlaybookTemplate]:
+    async def get_all_templates(self) -> List[PlaybookTemplate]:
         """Get all active templates"""
-        return self.db.query(PlaybookTemplate).filter(
-            PlaybookTemplate.is_active == True
-        ).all()
+        result = await self.db.execute(
+            select(PlaybookTemplate).filter(
+                PlaybookTemplate.is_active == True
+            )
+        )
+        return result.scalars().all()
     
-    def update_template(self, template_id: int, template_data: Dict[str, Any]) -> Optional[PlaybookTemplate]:
+    async def get_all_templates_summary(self) -> List:
+        """Get summary rows for all active templates.
+
+        Projects only the listed columns so the potentially large
+        template_content never crosses the DB socket.
+        """
+        result = await self.db.execute(
+            select(
+                PlaybookTemplate.id,
+                PlaybookTemplate.name,
+                PlaybookTemplate.description,
+                PlaybookTemplate.created_at,
+                PlaybookTemplate.variables_schema,
+            ).filter(PlaybookTemplate.is_active == True)
+        )
+        return result.all()
+    
+    async def update_template(self, template_id: int, template_data: Dict[str, Any]) -> Optional[PlaybookTemplate]:
         """Update an existing template"""
-        template = self.get_template(template_id)
+        template = await self.get_template(template_id)
         if not template:
             return None
-        
+
         for key, value in template_data.items():
             if hasattr(template, key):
                 setattr(template, key, value)
-        
-        self.db.commit()
-        self.db.refresh(template)
-        
+
+        await self.db.commit()
+        await self.db.refresh(template)
+
         logger.info(f"Updated template: {template.name}")
         return template
     
-    def delete_template(self, template_id: int) -> bool:
+    async def delete_template(self, template_id: int) -> bool:
         """Soft delete a template"""
-        template = self.get_template(template_id)
+        template = await self.get_template(template_id)
         if not template:
             return False
-        
+
         template.is_active = False
-        self.db.commit()
-        
+        await self.db.commit()
+
         logger.info(f"Deleted template: {template.name}")
         return True
     
-    def render_template(self, template_id: int, variables: Dict[str, Any]) -> str:
+    async def render_template(self, template_id: int, variables: Dict[str, Any]) -> str:
         """Render a template with variables"""
-        template = self.get_template(template_id)
+        template = await self.get_template(template_id)
         if not template:
             raise ValueError(f"Template {template_id} not found")
         
         try:
-            jinja_template = Template(template.template_content)
+            jinja_template = compile_template(template.template_content)
             return jinja_template.render(**variables)
         except Exception as e:
             logger.error(f"Template rendering error: {str(e)}")
             raise
+
+    @staticmethod
+    def _validator(schema: Dict[str, Any]):
+        """Return a compiled schema validator from the process-wide,
+        content-addressed cache"""
+        schema_hash = hashlib.sha1(
+            json.dumps(schema, sort_keys=True).encode()
+        ).hexdigest()
+        validator = _VALIDATOR_CACHE.get(schema_hash)
+        if validator is None:
+            validator = fastjsonschema.compile(schema)
+            _VALIDATOR_CACHE[schema_hash] = validator
+        return validator
     
-    def validate_variables(self, template_id: int, variables: Dict[str, Any]) -> Dict[str, Any]:
+    async def validate_variables(self, template_id: int, variables: Dict[str, Any]) -> Dict[str, Any]:
         """Validate variables against template schema"""
-        template = self.get_template(template_id)
+        template = await self.get_template(template_id)
         if not template:
             return {"valid": False, "errors": ["Template not found"]}
         
@@ -219,31 +302,22 @@ class TemplateManager:
             return {"valid": True, "errors": []}
         
         errors = []
-        
-        # Check required fields
-        required_fields = template.variables_schema.get("required", [])
-        for field in required_fields:
-            if field not in variables:
-                errors.append(f"Required field missing: {field}")
-        
-        # Check field types and constraints
-        properties = template.variables_schema.get("properties", {})
-        for field_name, field_value in variables.items():
-            if field_name in properties:
-                field_schema = properties[field_name]
-                
-                # Type validation
-                expected_type = field_schema.get("type")
-                if expected_type == "string" and not isinstance(field_value, str):
-                    errors.append(f"Field {field_name} must be a string")
-                elif expected_type == "integer" and not isinstance(field_value, int):
-                    errors.append(f"Field {field_name} must be an integer")
-                
-                # Enum validation
-                if "enum" in field_schema and field_value not in field_schema["enum"]:
-                    errors.append(f"Field {field_name} must be one of: {field_schema['enum']}")
+        validate = self._validator(template.variables_schema)
+        try:
+            validate(variables)
+        except fastjsonschema.JsonSchemaValueException as e:
+            if e.rule == "required":
+                # Keep the legacy error wording for missing fields
+                required_fields = template.variables_schema.get("required", [])
+                errors.extend(
+                    f"Required field missing: {field}"
+                    for field in required_fields
+                    if field not in variables
+                )
+            else:
+                errors.append(e.message)
         
         return {
             "valid": len(errors) == 0,
             "errors": errors
-        } 
\ No newline at end of file
+        }
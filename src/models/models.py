@@ -1,27 +1,46 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, JSON
+import csv
+import io
+import json
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, insert, Column, Index, Integer, String, DateTime, Text, Boolean, JSON
+from sqlalchemy.pool import NullPool
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 Base = declarative_base()
 
 
 class TaskModel(Base):
     __tablename__ = "tasks"
+    # Composite index serves both the restore scan ordered by run_time
+    # and keyset-style (run_time, id) lookups
+    __table_args__ = (
+        Index("ix_tasks_run_time_id", "run_time", "id"),
+        # GIN index so containment filters on generation metadata
+        # (e.g. provider) don't sequential-scan
+        Index("ix_tasks_gen_meta_gin", "generation_metadata", postgresql_using="gin"),
+    )
     id = Column(Integer, primary_key=True)
     playbook_path = Column(String, nullable=False)
     inventory = Column(String, nullable=False)
     run_time = Column(DateTime, nullable=False)
     playbook_content = Column(Text, nullable=True)  # Store generated playbook content
     is_generated = Column(Boolean, default=False)  # Flag for LLM-generated playbooks
-    generation_metadata = Column(JSON, nullable=True)  # Store LLM generation details
+    generation_metadata = Column(JSONB, nullable=True)  # Store LLM generation details
     safety_validated = Column(Boolean, default=False)  # Safety validation status
-    validation_errors = Column(JSON, nullable=True)  # Store validation errors
+    validation_errors = Column(JSONB, nullable=True)  # Store validation errors
 
 
 class PlaybookTemplate(Base):
     __tablename__ = "playbook_templates"
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    # Unique so the concurrent default-template seeding race surfaces as
+    # an IntegrityError instead of silently inserting duplicates
+    name = Column(String, nullable=False, unique=True)
     description = Column(Text, nullable=True)
     template_content = Column(Text, nullable=False)
     variables_schema = Column(JSON, nullable=True)  # JSON schema for template variables
@@ -30,10 +49,123 @@ class PlaybookTemplate(Base):
 
 
 DATABASE_URL = "postgresql://user123:password@db:5432/tasksdb"
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
+
+# Synchronous engine, still used by the Celery worker process.  Sized so
+# a burst of concurrent requests queues briefly instead of locking up the
+# QueuePool; LIFO checkout keeps the hottest connections warm.
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=20,
+    max_overflow=40,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    pool_use_lifo=True,
+    # Fold batched INSERTs into paged multi-row VALUES statements so a
+    # bulk ingest costs one round-trip per page, not per row
+    executemany_mode="values_plus_batch",
+    insertmanyvalues_page_size=500,
+    executemany_batch_page_size=100,
+    # Room for every distinct statement shape under load, so hot
+    # queries always hit the compiled-SQL cache
+    query_cache_size=2000,
+)
+# scoped_session gives each worker thread/greenlet its own session from
+# the registry instead of constructing one per call
+SessionLocal = scoped_session(
+    sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+    )
+)
+
+
+@contextmanager
+def session_scope():
+    """Single sync session context manager used by the worker code.
+
+    Scopes the session tightly around DB work so connections go back to
+    the pool as soon as the queries are done.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        # remove() closes the session and clears the registry entry, so
+        # finished worker threads/greenlets don't accumulate sessions
+        SessionLocal.remove()
+
+def bulk_insert_tasks(session, rows):
+    """Insert many task dicts in one paged statement and return the ids."""
+    result = session.execute(insert(TaskModel).returning(TaskModel.id), rows)
+    session.commit()
+    return result.scalars().all()
+
+
+def copy_tasks(rows):
+    """Bulk-load task rows with COPY FROM STDIN.
+
+    For very large ingests (thousands of rows) COPY streams a CSV buffer
+    straight into the table, bypassing per-row INSERT parsing entirely;
+    use bulk_insert_tasks for ordinary batches.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        generation_metadata = row.get("generation_metadata")
+        validation_errors = row.get("validation_errors")
+        writer.writerow([
+            row["playbook_path"],
+            row["inventory"],
+            row["run_time"].isoformat(),
+            # Unquoted empty fields read back as NULL under COPY csv
+            row.get("playbook_content") or "",
+            row.get("is_generated", False),
+            json.dumps(generation_metadata) if generation_metadata is not None else "",
+            row.get("safety_validated", False),
+            json.dumps(validation_errors) if validation_errors is not None else "",
+        ])
+    buf.seek(0)
+
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            cursor.copy_expert(
+                "COPY tasks (playbook_path, inventory, run_time, "
+                "playbook_content, is_generated, generation_metadata, "
+                "safety_validated, validation_errors) "
+                "FROM STDIN WITH (FORMAT csv)",
+                buf,
+            )
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Async engine for the FastAPI layer so DB round-trips don't block the
+# event loop.  asyncpg connections are bound to the event loop that
+# created them, and test runners spin up a loop per test, so pooling
+# there would hand the second test a connection from the first test's
+# dead loop; DB_POOLCLASS=null disables pooling for those runs.
+if os.environ.get("DB_POOLCLASS") == "null":
+    _async_pool_kwargs = {"poolclass": NullPool}
+else:
+    _async_pool_kwargs = {
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_pre_ping": True,
+    }
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    query_cache_size=2000,
+    **_async_pool_kwargs,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
 
 
-def init_db():
-    Base.metadata.create_all(bind=engine)
+async def init_db():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
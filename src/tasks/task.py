@@ -1,9 +1,13 @@
-from pydantic import BaseModel, Field
+import time
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
+from functools import cached_property
 from typing import Optional, List, Dict, Any
 
 
 class Task(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     playbook_path: str
     inventory: str
     run_time: datetime
@@ -11,8 +15,14 @@ class Task(BaseModel):
     is_generated: bool = False
     generation_metadata: Optional[Dict[str, Any]] = None
 
+    @cached_property
+    def _run_timestamp(self) -> float:
+        return self.run_time.timestamp()
+
     def calculate_eta(self):
-        return (self.run_time - datetime.now()).total_seconds()
+        # Plain float arithmetic: no datetime allocation per call, and
+        # the run_time conversion is computed once per task
+        return self._run_timestamp - time.time()
 
 
 class PlaybookGenerationRequest(BaseModel):
@@ -39,3 +49,16 @@ class PlaybookValidationResult(BaseModel):
     warnings: List[str] = []
     safety_score: float = 0.0
     recommendations: List[str] = []
+
+
+# Build the pydantic-core validators and serializers at import time so
+# the first request doesn't pay for lazy schema construction
+for _model in (
+    Task,
+    PlaybookGenerationRequest,
+    PlaybookTemplateRequest,
+    PlaybookValidationResult,
+):
+    _model.model_rebuild(force=True)
+    _model.__pydantic_validator__
+    _model.__pydantic_serializer__
@@ -0,0 +1,7 @@
+import os
+
+# Must be set before the app imports models.models: asyncpg connections
+# are bound to the event loop that created them, and the test runner
+# uses a fresh loop per test, so a shared pool would hand out
+# connections from an already-dead loop after the first test.
+os.environ.setdefault("DB_POOLCLASS", "null")
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 from src.llm.playbook_generator import PlaybookGenerator
 from src.llm.template_manager import TemplateManager
 
@@ -81,24 +81,37 @@ class TestPlaybookGenerator:
         assert "YAML parsing error" in result["errors"][0]
 
 
+def _mock_async_db(scalar_result=None):
+    """Mock AsyncSession whose queries resolve to the given scalar"""
+    mock_db = Mock()
+    result_mock = Mock()
+    result_mock.scalar_one_or_none.return_value = scalar_result
+    result_mock.scalars.return_value.all.return_value = []
+    mock_db.execute = AsyncMock(return_value=result_mock)
+    mock_db.commit = AsyncMock()
+    mock_db.refresh = AsyncMock()
+    return mock_db
+
+
 class TestTemplateManager:
     """Test cases for TemplateManager"""
     
-    def test_initialize_default_templates(self):
+    @pytest.mark.asyncio
+    async def test_initialize_default_templates(self):
         """Test initialization of default templates"""
-        mock_db = Mock()
-        mock_db.query.return_value.filter.return_value.first.return_value = None
+        mock_db = _mock_async_db(scalar_result=None)
         
         manager = TemplateManager(mock_db)
-        manager.initialize_default_templates()
+        await manager.initialize_default_templates()
         
-        # Verify that templates were added
-        assert mock_db.add.call_count == 2  # Two default templates
-        mock_db.commit.assert_called_once()
+        # One SELECT for existing names plus one batched INSERT
+        assert mock_db.execute.await_count == 2
+        mock_db.commit.assert_awaited_once()
     
-    def test_create_template(self):
+    @pytest.mark.asyncio
+    async def test_create_template(self):
         """Test template creation"""
-        mock_db = Mock()
+        mock_db = _mock_async_db()
         manager = TemplateManager(mock_db)
         
         template_data = {
@@ -108,15 +121,15 @@ class TestTemplateManager:
             "variables_schema": {"type": "object"}
         }
         
-        result = manager.create_template(template_data)
+        result = await manager.create_template(template_data)
         
         assert result.name == "Test Template"
         mock_db.add.assert_called_once()
-        mock_db.commit.assert_called_once()
+        mock_db.commit.assert_awaited_once()
     
-    def test_validate_variables_valid(self):
+    @pytest.mark.asyncio
+    async def test_validate_variables_valid(self):
         """Test variable validation with valid data"""
-        mock_db = Mock()
         mock_template = Mock()
         mock_template.variables_schema = {
             "type": "object",
@@ -127,18 +140,18 @@ class TestTemplateManager:
             "required": ["hosts"]
         }
         
-        mock_db.query.return_value.filter.return_value.first.return_value = mock_template
+        mock_db = _mock_async_db(scalar_result=mock_template)
         
         manager = TemplateManager(mock_db)
         variables = {"hosts": "web_servers", "port": 80}
         
-        result = manager.validate_variables(1, variables)
+        result = await manager.validate_variables(1, variables)
         assert result["valid"] is True
         assert len(result["errors"]) == 0
     
-    def test_validate_variables_invalid(self):
+    @pytest.mark.asyncio
+    async def test_validate_variables_invalid(self):
         """Test variable validation with invalid data"""
-        mock_db = Mock()
         mock_template = Mock()
         mock_template.variables_schema = {
             "type": "object",
@@ -148,12 +161,12 @@ class TestTemplateManager:
             "required": ["hosts"]
         }
         
-        mock_db.query.return_value.filter.return_value.first.return_value = mock_template
+        mock_db = _mock_async_db(scalar_result=mock_template)
         
         manager = TemplateManager(mock_db)
         variables = {"port": 80}  # Missing required 'hosts'
         
-        result = manager.validate_variables(1, variables)
+        result = await manager.validate_variables(1, variables)
         assert result["valid"] is False
         assert "Required field missing: hosts" in result["errors"][0]
 
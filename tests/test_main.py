@@ -1,13 +1,31 @@
 import pytest
-from fastapi.testclient import TestClient
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import delete
 from src.crud.api import app
+from src.models.models import AsyncSessionLocal, TaskModel, init_db
 
-client = TestClient(app)
+
+@pytest_asyncio.fixture
+async def async_client():
+    """Drive the app in-process on the test's own event loop.
+
+    ASGITransport does not run the lifespan, so create the schema
+    explicitly before handing out the client."""
+    await init_db()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    # Delete the task rows the test created so suites that assert exact
+    # counts on the shared tasksdb aren't order-dependent on this one
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(TaskModel))
+        await db.commit()
 
 
 @pytest.mark.asyncio
-async def test_add_task():
-    response = await client.post(
+async def test_add_task(async_client):
+    response = await async_client.post(
         "/add-task/",
         json={
             "playbook_path": "path/to/playbook.yml",
@@ -21,9 +39,9 @@ async def test_add_task():
 
 
 @pytest.mark.asyncio
-async def test_remove_task():
+async def test_remove_task(async_client):
     # Add task
-    response = await client.post(
+    response = await async_client.post(
         "/add-task/",
         json={
             "playbook_path": "path/to/playbook.yml",
@@ -33,6 +51,6 @@ async def test_remove_task():
     )
     task_id = response.json()["task_id"]
 
-    delete_response = await client.delete(f"/remove-task/{task_id}")
+    delete_response = await async_client.delete(f"/remove-task/{task_id}")
     assert delete_response.status_code == 200
     assert delete_response.json()["message"] == (f"Task " f"{task_id} revoked")
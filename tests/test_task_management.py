@@ -1,20 +1,55 @@
 import pytest
-from fastapi.testclient import TestClient
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
 from src.crud.api import app
-from src.models.models import TaskModel, SessionLocal
+from src.models.models import (
+    Base,
+    TaskModel,
+    SessionLocal,
+    bulk_insert_tasks,
+    copy_tasks,
+    engine,
+)
+from sqlalchemy import delete
 from datetime import datetime
 
-client = TestClient(app)
+
+@pytest.fixture(scope="session", autouse=True)
+def create_schema():
+    """Create the tables up front; the test transport never runs the lifespan"""
+    Base.metadata.create_all(bind=engine)
+
+
+@pytest_asyncio.fixture
+async def client():
+    """Drive the app in-process on the test's own event loop.
+
+    TestClient spins up a fresh loop per request, which the pooled
+    asyncpg connections cannot survive; ASGITransport keeps every
+    request on this test's loop instead."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
 
 
 @pytest.fixture
 def db_session():
-    """Create a database session for testing"""
-    db = SessionLocal()
+    """Committed-rows session with explicit cleanup.
+
+    Fixture rows must be committed so the endpoints, which read through
+    their own async sessions, can see them; the tasks table is cleared
+    before the test as well as after, so rows left by other suites
+    can't skew the exact-count assertions."""
+    session = SessionLocal()
+    session.execute(delete(TaskModel))
+    session.commit()
     try:
-        yield db
+        yield session
     finally:
-        db.close()
+        session.rollback()
+        session.execute(delete(TaskModel))
+        session.commit()
+        SessionLocal.remove()
 
 
 @pytest.fixture
@@ -29,31 +64,34 @@ def sample_task(db_session):
     )
     db_session.add(task)
     db_session.commit()
-    db_session.refresh(task)
+    # No refresh needed: the flush already returned the generated id
     return task
 
 
-def test_list_tasks_empty(db_session):
+@pytest.mark.asyncio
+async def test_list_tasks_empty(client, db_session):
     """Test listing tasks when database is empty"""
-    response = client.get("/tasks/")
+    response = await client.get("/tasks/")
     assert response.status_code == 200
-    
+
     data = response.json()
     assert data["success"] is True
     assert data["tasks"] == []
     assert data["total_count"] == 0
+    assert data["next_cursor"] is None
 
 
-def test_list_tasks_with_data(db_session, sample_task):
+@pytest.mark.asyncio
+async def test_list_tasks_with_data(client, db_session, sample_task):
     """Test listing tasks with data in database"""
-    response = client.get("/tasks/")
+    response = await client.get("/tasks/")
     assert response.status_code == 200
-    
+
     data = response.json()
     assert data["success"] is True
     assert len(data["tasks"]) == 1
     assert data["total_count"] == 1
-    
+
     task = data["tasks"][0]
     assert task["id"] == sample_task.id
     assert task["playbook_path"] == sample_task.playbook_path
@@ -62,27 +100,30 @@ def test_list_tasks_with_data(db_session, sample_task):
     assert task["safety_validated"] == sample_task.safety_validated
 
 
-def test_get_task_success(db_session, sample_task):
+@pytest.mark.asyncio
+async def test_get_task_success(client, db_session, sample_task):
     """Test getting a specific task"""
-    response = client.get(f"/tasks/{sample_task.id}")
+    response = await client.get(f"/tasks/{sample_task.id}")
     assert response.status_code == 200
-    
+
     data = response.json()
     assert data["success"] is True
     assert data["task"]["id"] == sample_task.id
     assert data["task"]["playbook_path"] == sample_task.playbook_path
 
 
-def test_get_task_not_found(db_session):
+@pytest.mark.asyncio
+async def test_get_task_not_found(client, db_session):
     """Test getting a task that doesn't exist"""
-    response = client.get("/tasks/999")
+    response = await client.get("/tasks/999")
     assert response.status_code == 404
-    
+
     data = response.json()
     assert "not found" in data["detail"].lower()
 
 
-def test_list_tasks_with_generated_playbook(db_session):
+@pytest.mark.asyncio
+async def test_list_tasks_with_generated_playbook(client, db_session):
     """Test listing tasks with LLM-generated playbook"""
     task = TaskModel(
         playbook_path="/tmp/generated_playbook.yml",
@@ -99,20 +140,21 @@ def test_list_tasks_with_generated_playbook(db_session):
     )
     db_session.add(task)
     db_session.commit()
-    
-    response = client.get("/tasks/")
+
+    response = await client.get("/tasks/")
     assert response.status_code == 200
-    
+
     data = response.json()
     assert len(data["tasks"]) == 1
-    
+
     task_data = data["tasks"][0]
     assert task_data["is_generated"] is True
     assert task_data["safety_validated"] is True
     assert task_data["generation_metadata"]["provider"] == "openai"
 
 
-def test_get_task_with_full_details(db_session):
+@pytest.mark.asyncio
+async def test_get_task_with_full_details(client, db_session):
     """Test getting task with all details including playbook content"""
     task = TaskModel(
         playbook_path="/tmp/generated_playbook.yml",
@@ -129,11 +171,10 @@ def test_get_task_with_full_details(db_session):
     )
     db_session.add(task)
     db_session.commit()
-    db_session.refresh(task)
-    
-    response = client.get(f"/tasks/{task.id}")
+
+    response = await client.get(f"/tasks/{task.id}")
     assert response.status_code == 200
-    
+
     data = response.json()
     task_data = data["task"]
     assert task_data["playbook_content"] is not None
@@ -141,48 +182,106 @@ def test_get_task_with_full_details(db_session):
     assert task_data["generation_metadata"]["provider"] == "openai"
 
 
-def test_list_tasks_multiple(db_session):
+@pytest.mark.asyncio
+async def test_list_tasks_multiple(client, db_session):
     """Test listing multiple tasks"""
-    # Create multiple tasks
-    tasks = []
-    for i in range(3):
-        task = TaskModel(
-            playbook_path=f"/test/playbook_{i}.yml",
-            inventory="/test/inventory",
-            run_time=datetime.now(),
-            is_generated=i % 2 == 0,  # Alternate between generated and not
-            safety_validated=i % 2 == 0
-        )
-        db_session.add(task)
-        tasks.append(task)
-    
-    db_session.commit()
-    
-    response = client.get("/tasks/")
+    # Create multiple tasks through the bulk insert path
+    rows = [
+        {
+            "playbook_path": f"/test/playbook_{i}.yml",
+            "inventory": "/test/inventory",
+            "run_time": datetime.now(),
+            "is_generated": i % 2 == 0,  # Alternate between generated and not
+            "safety_validated": i % 2 == 0,
+        }
+        for i in range(3)
+    ]
+    expected_ids = bulk_insert_tasks(db_session, rows)
+
+    response = await client.get("/tasks/")
     assert response.status_code == 200
-    
+
     data = response.json()
     assert len(data["tasks"]) == 3
     assert data["total_count"] == 3
-    
+
     # Verify all tasks are returned
     task_ids = [task["id"] for task in data["tasks"]]
-    expected_ids = [task.id for task in tasks]
     assert set(task_ids) == set(expected_ids)
 
 
-def test_task_status_integration(db_session, sample_task):
+@pytest.mark.asyncio
+async def test_list_tasks_paginated(client, db_session):
+    """Test that limit/cursor walk the task list page by page"""
+    rows = [
+        {
+            "playbook_path": f"/test/playbook_{i}.yml",
+            "inventory": "/test/inventory",
+            "run_time": datetime.now(),
+            "is_generated": False,
+            "safety_validated": False,
+        }
+        for i in range(3)
+    ]
+    expected_ids = bulk_insert_tasks(db_session, rows)
+
+    response = await client.get("/tasks/", params={"limit": 2})
+    assert response.status_code == 200
+    first_page = response.json()
+    assert len(first_page["tasks"]) == 2
+    assert first_page["next_cursor"] is not None
+
+    response = await client.get(
+        "/tasks/", params={"limit": 2, "cursor": first_page["next_cursor"]}
+    )
+    assert response.status_code == 200
+    second_page = response.json()
+    assert len(second_page["tasks"]) == 1
+
+    seen_ids = [t["id"] for t in first_page["tasks"] + second_page["tasks"]]
+    assert set(seen_ids) == set(expected_ids)
+
+
+@pytest.mark.asyncio
+async def test_copy_tasks_bulk_load(client, db_session):
+    """Test that COPY ingestion loads content and metadata columns"""
+    rows = [
+        {
+            "playbook_path": f"/test/playbook_{i}.yml",
+            "inventory": "/test/inventory",
+            "run_time": datetime.now(),
+            "playbook_content": "---\n- name: Test playbook\n  hosts: all",
+            "is_generated": True,
+            "generation_metadata": {"provider": "openai"},
+            "safety_validated": True,
+        }
+        for i in range(3)
+    ]
+    copy_tasks(rows)
+
+    response = await client.get("/tasks/", params={"detailed": True})
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["total_count"] == 3
+    for task in data["tasks"]:
+        assert "Test playbook" in task["playbook_content"]
+        assert task["generation_metadata"]["provider"] == "openai"
+
+
+@pytest.mark.asyncio
+async def test_task_status_integration(client, db_session, sample_task):
     """Test that task status is included in response"""
-    response = client.get("/tasks/")
+    response = await client.get("/tasks/")
     assert response.status_code == 200
-    
+
     data = response.json()
     task = data["tasks"][0]
-    
+
     # Status should be present (even if UNKNOWN)
     assert "status" in task
     assert isinstance(task["status"], str)
 
 
 if __name__ == "__main__":
-    pytest.main([__file__]) 
\ No newline at end of file
+    pytest.main([__file__])